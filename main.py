@@ -32,7 +32,7 @@ def main():
         logger.info("Application terminated by user")
         print("\nApplication terminated by user.")
     except Exception as e:
-        logger.exception(f"Critical error in application: {str(e)}")
+        logger.exception("Critical error in application: %s", e)
         print(f"Critical error: {str(e)}")
         print("Please check logs for details.")
         sys.exit(1)
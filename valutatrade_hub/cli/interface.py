@@ -1,5 +1,8 @@
+import heapq
 import logging
+import sys
 from datetime import datetime
+from functools import lru_cache
 from typing import Dict
 
 from prettytable import PrettyTable
@@ -15,88 +18,163 @@ from ..core.exceptions import (
     WalletNotFoundError,
 )
 from ..core.usecases import RatesUsecases, TradingUsecases, UserUsecases
-from ..core.utils import format_currency_amount, parse_args, split_command
+from ..core.utils import (
+    format_currency_amount,
+    parse_command_line,
+    validate_currency_code,
+)
 from ..infra.database import DatabaseManager
 
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=256)
+def _fmt_ts(iso: str) -> str:
+    """Отформатировать ISO-метку времени для отображения.
+
+    Кешируется: при массовом обновлении у большинства пар одна и та же
+    метка, так что fromisoformat вызывается один раз на уникальное значение.
+    """
+    try:
+        if iso.endswith("Z"):
+            iso = iso[:-1] + "+00:00"
+        return datetime.fromisoformat(iso).strftime("%Y-%m-%d %H:%M:%S")
+    except (ValueError, TypeError, AttributeError):
+        return iso
+
 class CLIInterface:
     """Класс для интерфейса командной строки."""
-    
+
+    # Таблица команд на уровне класса: имена методов-обработчиков.
+    # Строится один раз, а не на каждый вызов _process_command.
+    _COMMAND_TABLE = {
+        "help": "_cmd_help",
+        "register": "_cmd_register",
+        "login": "_cmd_login",
+        "logout": "_cmd_logout",
+        "show-portfolio": "_cmd_show_portfolio",
+        "buy": "_cmd_buy",
+        "sell": "_cmd_sell",
+        "get-rate": "_cmd_get_rate",
+        "update-rates": "_cmd_update_rates",
+        "show-rates": "_cmd_show_rates"
+    }
+
     def __init__(self):
         self.user_usecases = UserUsecases()
         self.trading_usecases = TradingUsecases()
         self.rates_usecases = RatesUsecases()
         self.current_user = None
         self.db = DatabaseManager()
-    
+        self._update_prompt()
+        self._help_text = self._build_help_text()
+        # Инвертированные индексы пар по валютам (для show-rates),
+        # перестраиваются только при изменении last_refresh кеша курсов
+        self._rates_index_version = None
+        self._pairs_by_base: Dict[str, set] = {}
+        self._pairs_by_quote: Dict[str, set] = {}
+
     def run(self):
         """Запустить интерфейс командной строки."""
         logger.info("Starting CLI interface")
-        
+
+        if not sys.stdin.isatty():
+            self._run_piped()
+            return
+
         print("Welcome to ValutaTrade Hub!")
         print("Type 'help' to see available commands or 'exit' to quit.")
-        
+
         while True:
             try:
-                command_line = input(f"\n{self._get_prompt()}> ").strip()
+                command_line = input(self._prompt_str).strip()
                 if not command_line:
                     continue
-                
+
                 if command_line.lower() == "exit":
                     print("Goodbye!")
                     break
-                
+
                 self._process_command(command_line)
-                
+
             except KeyboardInterrupt:
                 print("\nOperation cancelled by user.")
             except Exception as e:
-                logger.exception(f"Unexpected error: {str(e)}")
+                logger.exception("Unexpected error: %s", e)
                 print(f"Error: {str(e)}")
                 print("Please try again or type 'help' for assistance.")
-    
-    def _get_prompt(self) -> str:
-        """Получить приглашение для ввода команды."""
+
+    def _run_piped(self):
+        """Обработать команды из неинтерактивного stdin (пайп или скрипт).
+
+        Читаем stdin построчно без печати приглашения: это убирает
+        накладные расходы input() на каждую строку при пакетном вводе.
+        """
+        for command_line in sys.stdin:
+            command_line = command_line.strip()
+            if not command_line:
+                continue
+
+            if command_line.lower() == "exit":
+                break
+
+            try:
+                self._process_command(command_line)
+            except Exception as e:
+                logger.exception("Unexpected error: %s", e)
+                print(f"Error: {str(e)}")
+
+    def _update_prompt(self):
+        """Пересчитать кешированную строку приглашения (логин/логаут)."""
         if self.current_user:
-            return f"{self.current_user['username']}@valutatrade"
-        return "guest@valutatrade"
+            self._prompt_str = f"\n{self.current_user['username']}@valutatrade> "
+        else:
+            self._prompt_str = "\nguest@valutatrade> "
+
+    def _get_rates_index(self, rates_data: Dict):
+        """Получить индексы пар по базовой и котируемой валюте.
+
+        Индексы перестраиваются только когда меняется last_refresh,
+        чтобы не сканировать и не сплитить все пары на каждый запрос.
+        """
+        version = rates_data.get("last_refresh")
+        if version != self._rates_index_version:
+            by_base: Dict[str, set] = {}
+            by_quote: Dict[str, set] = {}
+            for pair in rates_data.get("pairs", {}):
+                from_curr, _, to_curr = pair.partition('_')
+                by_base.setdefault(from_curr, set()).add(pair)
+                by_quote.setdefault(to_curr, set()).add(pair)
+            self._pairs_by_base = by_base
+            self._pairs_by_quote = by_quote
+            self._rates_index_version = version
+        return self._pairs_by_base, self._pairs_by_quote
     
     def _process_command(self, command_line: str):
         """Обработать команду пользователя."""
-        args = split_command(command_line)
-        if not args:
+        command, arg_items = parse_command_line(command_line)
+        if not command:
             return
-        
-        command = args[0].lower()
-        command_args = parse_args(args[1:])
-        
-        # Словарь команд
-        commands = {
-            "help": self._cmd_help,
-            "register": self._cmd_register,
-            "login": self._cmd_login,
-            "logout": self._cmd_logout,
-            "show-portfolio": self._cmd_show_portfolio,
-            "buy": self._cmd_buy,
-            "sell": self._cmd_sell,
-            "get-rate": self._cmd_get_rate,
-            "update-rates": self._cmd_update_rates,
-            "show-rates": self._cmd_show_rates
-        }
-        
-        if command in commands:
-            commands[command](command_args)
+
+        command_args = dict(arg_items)
+
+        handler_name = self._COMMAND_TABLE.get(command)
+        if handler_name is not None:
+            getattr(self, handler_name)(command_args)
         else:
             print(f"Unknown command: {command}")
             print("Type 'help' to see available commands.")
     
     def _cmd_help(self, args: Dict[str, str]):
         """Показать справку по командам."""
+        print(self._help_text)
+
+    @staticmethod
+    def _build_help_text() -> str:
+        """Построить текст справки один раз: данные полностью статичны."""
         table = PrettyTable()
         table.field_names = ["Command", "Description", "Arguments"]
         table.align = "l"
-        
+
         help_data = [
             ("help", "Show this help message", ""),
             ("register", "Register a new user", "--username <name> --password <pwd>"),
@@ -106,15 +184,15 @@ class CLIInterface:
             ("buy", "Buy currency", "--currency <code> --amount <number>"),
             ("sell", "Sell currency", "--currency <code> --amount <number>"),
             ("get-rate", "Get exchange rate", "--from <code> --to <code>"),
-            ("update-rates", "Update exchange rates", "[--source <coingecko|exchangerate>]"),
+            ("update-rates", "Update exchange rates", "[--source <coingecko|exchangerate>] [--force]"),
             ("show-rates", "Show cached rates", "[--currency <code>] [--top <number>] [--base <code>]"),
             ("exit", "Exit the application", "")
         ]
         
         for cmd, desc, args_desc in help_data:
             table.add_row([cmd, desc, args_desc])
-        
-        print(table)
+
+        return str(table)
     
     def _cmd_register(self, args: Dict[str, str]):
         """Зарегистрировать нового пользователя."""
@@ -156,6 +234,7 @@ class CLIInterface:
         try:
             user_data = self.user_usecases.authenticate_user(username, password)
             self.current_user = user_data
+            self._update_prompt()
             print(f"Successfully logged in as '{username}'")
         except UserNotFoundError:
             print(f"Error: User '{username}' not found")
@@ -169,6 +248,7 @@ class CLIInterface:
         if self.current_user:
             username = self.current_user["username"]
             self.current_user = None
+            self._update_prompt()
             print(f"Successfully logged out from '{username}'")
         else:
             print("You are not logged in.")
@@ -184,18 +264,21 @@ class CLIInterface:
         
         try:
             # Валидация базовой валюты
-            from ..core.utils import validate_currency_code
             validate_currency_code(base_currency)
-            
+
             portfolio_data = self.trading_usecases.get_portfolio(self.current_user["user_id"], base_currency)
-            
-            print(f"\nPortfolio for '{self.current_user['username']}' (base currency: {base_currency})")
-            print("-" * 60)
-            
+
+            # Копим вывод и пишем одним вызовом вместо серии print
+            lines = [
+                f"\nPortfolio for '{self.current_user['username']}' (base currency: {base_currency})",
+                "-" * 60,
+            ]
+
             if not portfolio_data["wallets"]:
-                print("Your portfolio is empty. Use 'buy' command to add currencies.")
+                lines.append("Your portfolio is empty. Use 'buy' command to add currencies.")
+                sys.stdout.write("\n".join(lines) + "\n")
                 return
-            
+
             table = PrettyTable()
             table.field_names = ["Currency", "Balance", f"Value in {base_currency}"]
             table.align = "r"
@@ -216,10 +299,12 @@ class CLIInterface:
                 if value_in_base is not None:
                     total_value += value_in_base
             
-            print(table)
-            print("-" * 60)
-            print(f"TOTAL VALUE: {format_currency_amount(total_value, base_currency)} {base_currency}")
-            
+            lines.append(str(table))
+            lines.append("-" * 60)
+            lines.append(f"TOTAL VALUE: {format_currency_amount(total_value, base_currency)} {base_currency}")
+            sys.stdout.write("\n".join(lines) + "\n")
+            sys.stdout.flush()
+
         except CurrencyNotFoundError as e:
             print(f"Error: {str(e)}")
             print("Supported currencies: USD, EUR, GBP, RUB, BTC, ETH, SOL")
@@ -397,28 +482,36 @@ class CLIInterface:
     def _cmd_update_rates(self, args: Dict[str, str]):
         """Обновить курсы валют."""
         source = args.get("source")
-        
+        force = bool(args.get("force"))
+
         print("🔄 Updating exchange rates...")
-        
+
         try:
-            result = self.rates_usecases.update_rates(source)
-            
-            if result["success"]:
-                print("✅ Exchange rates updated successfully!")
-                print(f"Updated {len(result['updated_pairs'])} currency pairs")
-                print(f"Last refresh: {result['timestamp']}")
+            result = self.rates_usecases.update_rates(source, force=force)
+
+            # Копим вывод и пишем одним вызовом вместо серии print
+            lines = []
+            if result.get("skipped"):
+                lines.append("✅ Exchange rates are still fresh, update skipped.")
+                lines.append("Use 'update-rates --force' to refresh anyway.")
+            elif result["success"]:
+                lines.append("✅ Exchange rates updated successfully!")
+                lines.append(f"Updated {len(result['updated_pairs'])} currency pairs")
+                lines.append(f"Last refresh: {result['timestamp']}")
             else:
-                print("⚠️  Exchange rates update completed with errors:")
+                lines.append("⚠️  Exchange rates update completed with errors:")
                 for error in result["errors"]:
-                    print(f"  - {error}")
-                print("Check logs for details.")
-            
+                    lines.append(f"  - {error}")
+                lines.append("Check logs for details.")
+
             # Показываем информацию о кеше
             cache_info = self.rates_usecases.get_cached_rates_info()
-            print("\nCache status:")
-            print(f"  Last refresh: {cache_info['last_refresh']}")
-            print(f"  Currency pairs: {cache_info['pairs_count']}")
-            
+            lines.append("\nCache status:")
+            lines.append(f"  Last refresh: {cache_info['last_refresh']}")
+            lines.append(f"  Currency pairs: {cache_info['pairs_count']}")
+            sys.stdout.write("\n".join(lines) + "\n")
+            sys.stdout.flush()
+
         except ApiRequestError as e:
             print(f"❌ Error updating rates: {str(e)}")
             print("Please check your network connection and API configuration.")
@@ -435,9 +528,8 @@ class CLIInterface:
         
         try:
             # Валидация базовой валюты
-            from ..core.utils import validate_currency_code
             validate_currency_code(base_currency)
-            
+
             # Получаем курсы из базы данных
             rates_data = self.db.get_rates()
             pairs = rates_data.get("pairs", {})
@@ -453,40 +545,30 @@ class CLIInterface:
                 print("Update rates with 'update-rates' command.")
                 return
             
-            # Фильтрация по валюте
-            filtered_pairs = {}
+            by_base, by_quote = self._get_rates_index(rates_data)
+
+            # Фильтрация по валюте через инвертированный индекс
             if currency_filter:
                 currency_filter = currency_filter.upper()
-                for pair, data in pairs.items():
-                    from_curr, to_curr = pair.split('_')
-                    if from_curr == currency_filter or to_curr == currency_filter:
-                        filtered_pairs[pair] = data
+                pair_keys = by_base.get(currency_filter, set()) | by_quote.get(currency_filter, set())
+                # Обходим pairs, а не множество: порядок вывода совпадает
+                # с порядком пар в файле курсов и не зависит от хеширования
+                filtered_pairs = {pair: data for pair, data in pairs.items() if pair in pair_keys}
             else:
                 filtered_pairs = pairs
-            
+
             if not filtered_pairs:
                 if currency_filter:
                     print(f"No rates found for currency '{currency_filter}'")
                 else:
                     print("No exchange rates available")
                 return
-            
-            # Сортировка для top N
+
+            # Отбор top N среди пар с базовой валютой (без полной сортировки)
             if top_n and isinstance(top_n, int) and top_n > 0:
-                # Фильтруем пары с базовой валютой
-                base_pairs = {
-                    pair: data for pair, data in filtered_pairs.items()
-                    if pair.endswith(f"_{base_currency}")
-                }
-                
-                # Сортируем по курсу в обратном порядке (самые дорогие вверху)
-                sorted_pairs = sorted(
-                    base_pairs.items(),
-                    key=lambda x: x[1]["rate"],
-                    reverse=True
-                )[:top_n]
-                
-                filtered_pairs = dict(sorted_pairs)
+                base_keys = by_quote.get(base_currency, set()).intersection(filtered_pairs)
+                top_keys = heapq.nlargest(top_n, base_keys, key=lambda pair: pairs[pair]["rate"])
+                filtered_pairs = {pair: pairs[pair] for pair in top_keys}
             
             # Выводим результаты
             table = PrettyTable()
@@ -499,15 +581,8 @@ class CLIInterface:
                 rate = data["rate"]
                 source = data["source"]
                 updated_at = data["updated_at"]
-                
-                # Форматируем дату для отображения
-                try:
-                    dt = datetime.fromisoformat(updated_at.replace("Z", "+00:00"))
-                    updated_str = dt.strftime("%Y-%m-%d %H:%M:%S")
-                except (ValueError, TypeError):
-                    updated_str = updated_at
-                
-                table.add_row([pair, f"{rate:.6f}", source, updated_str])
+
+                table.add_row([pair, f"{rate:.6f}", source, _fmt_ts(updated_at)])
             
             print(table)
             
@@ -1,12 +1,21 @@
+import re
+import sys
 from abc import ABC, abstractmethod
 from typing import List
 
 from .exceptions import CurrencyNotFoundError
 
+# 2-5 символов: буквы, цифры и дефис (компилируется один раз при импорте)
+_CODE_RE = re.compile(r"^[A-Za-z0-9\-]{2,5}$")
+
 
 class Currency(ABC):
     """Абстрактный базовый класс для валют."""
-    
+
+    # ABC объявляет пустые __slots__, поэтому иерархия остаётся без __dict__:
+    # атрибуты читаются через C-дескрипторы и экземпляры занимают меньше памяти
+    __slots__ = ("name", "code")
+
     def __init__(self, name: str, code: str):
         """
         Инициализация валюты.
@@ -19,17 +28,15 @@ class Currency(ABC):
         self._validate_name(name)
         
         self.name = name
-        self.code = code.upper()
+        self.code = sys.intern(code.upper())
     
     def _validate_code(self, code: str):
         """Валидация кода валюты."""
-        if not code or not code.strip():
-            raise ValueError("Код валюты не может быть пустым")
-        if len(code) < 2 or len(code) > 5:
-            raise ValueError("Код валюты должен содержать от 2 до 5 символов")
-        if not code.replace('-', '').isalnum():
-            raise ValueError("Код валюты может содержать только буквы, цифры и дефис")
-    
+        if not code or not _CODE_RE.match(code.strip()):
+            raise ValueError(
+                "Код валюты должен содержать от 2 до 5 символов: буквы, цифры и дефис"
+            )
+
     def _validate_name(self, name: str):
         """Валидация имени валюты."""
         if not name or not name.strip():
@@ -42,7 +49,9 @@ class Currency(ABC):
 
 class FiatCurrency(Currency):
     """Класс для фиатных валют."""
-    
+
+    __slots__ = ("issuing_country",)
+
     def __init__(self, name: str, code: str, issuing_country: str):
         """
         Инициализация фиатной валюты.
@@ -61,7 +70,9 @@ class FiatCurrency(Currency):
 
 class CryptoCurrency(Currency):
     """Класс для криптовалют."""
-    
+
+    __slots__ = ("algorithm", "market_cap")
+
     def __init__(self, name: str, code: str, algorithm: str, market_cap: float):
         """
         Инициализация криптовалюты.
@@ -101,10 +112,11 @@ def get_currency(code: str) -> Currency:
     Raises:
         CurrencyNotFoundError: Если валюта не найдена
     """
-    code_upper = code.upper()
-    if code_upper not in _CURRENCY_REGISTRY:
-        raise CurrencyNotFoundError(code_upper)
-    return _CURRENCY_REGISTRY[code_upper]
+    # Один поиск по словарю вместо пары "in" + [] (два хеширования)
+    currency = _CURRENCY_REGISTRY.get(code.upper())
+    if currency is None:
+        raise CurrencyNotFoundError(code.upper())
+    return currency
 
 def get_all_currencies() -> List[Currency]:
     """Получить список всех зарегистрированных валют."""
@@ -1,12 +1,35 @@
-import random
-import string
+import hashlib
+import hmac
+import secrets
+import sys
 from datetime import datetime
-from hashlib import sha256
-from typing import Dict, Union
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Dict, Tuple, Union
 
 from .currencies import get_currency
 from .exceptions import InsufficientFundsError, WalletNotFoundError
 
+# Число итераций PBKDF2 (должно совпадать с хешированием при регистрации)
+PBKDF2_ITERATIONS = 100_000
+
+
+@lru_cache(maxsize=None)
+def _validated_currency(currency_code: str) -> str:
+    """Проверить код валюты для кошелька (с кешированием результата).
+
+    Набор валют мал и неизменен во время работы, поэтому повторная
+    проверка того же кода - один поиск в кеше. Исключения lru_cache
+    не кеширует, так что валюты, зарегистрированные позже, подхватятся.
+    """
+    if not currency_code or not currency_code.strip():
+        raise ValueError("Код валюты не может быть пустым")
+    try:
+        get_currency(currency_code)
+    except Exception as e:
+        raise ValueError(f"Недопустимая валюта: {currency_code}") from e
+    return currency_code
+
 
 class User:
     """Класс пользователя системы."""
@@ -60,20 +83,32 @@ class User:
     
     def verify_password(self, password: str) -> bool:
         """Проверить пароль пользователя."""
-        hashed_input = sha256((password + self._salt).encode()).hexdigest()
-        return hashed_input == self._hashed_password
-    
+        hashed_input = hashlib.pbkdf2_hmac(
+            'sha256', password.encode(), self._salt.encode(), PBKDF2_ITERATIONS
+        ).hex()
+        # Сравнение за постоянное время - защита от timing-атак
+        return hmac.compare_digest(hashed_input, self._hashed_password)
+
     def change_password(self, new_password: str) -> None:
         """Изменить пароль пользователя."""
         if len(new_password) < 4:
             raise ValueError("Пароль должен быть не короче 4 символов")
-        
-        self._salt = ''.join(random.choices(string.ascii_letters + string.digits, k=16))
-        self._hashed_password = sha256((new_password + self._salt).encode()).hexdigest()
+
+        self._salt = secrets.token_urlsafe(12)
+        self._hashed_password = hashlib.pbkdf2_hmac(
+            'sha256', new_password.encode(), self._salt.encode(), PBKDF2_ITERATIONS
+        ).hex()
 
 class Wallet:
     """Класс кошелька для конкретной валюты."""
-    
+
+    # Кошельков создается по одному на валюту при каждой загрузке портфеля:
+    # __slots__ убирает __dict__ и ускоряет доступ к атрибутам
+    __slots__ = ("currency_code", "_balance")
+
+    currency_code: str
+    _balance: float
+
     def __init__(self, currency_code: str, balance: float = 0.0):
         """
         Инициализация кошелька.
@@ -82,21 +117,26 @@ class Wallet:
             currency_code: Код валюты
             balance: Начальный баланс
         """
-        self._validate_currency(currency_code)
-        
-        self.currency_code = currency_code.upper()
+        _validated_currency(currency_code)
+
+        self.currency_code = sys.intern(currency_code.upper())
         self._balance = 0.0
-        self.deposit(balance)
-    
-    def _validate_currency(self, currency_code: str):
-        """Валидация кода валюты."""
-        if not currency_code or not currency_code.strip():
-            raise ValueError("Код валюты не может быть пустым")
-        try:
-            get_currency(currency_code)
-        except Exception as e:
-            raise ValueError(f"Недопустимая валюта: {currency_code}") from e
-    
+        if balance:
+            self.deposit(balance)
+
+    @classmethod
+    def _from_raw(cls, currency_code: str, balance: float) -> "Wallet":
+        """Создать кошелек из доверенных данных БД без валидации.
+
+        Данные в хранилище уже проходили проверку при записи, поэтому
+        при загрузке портфеля повторная валидация кода и прогон баланса
+        через сеттер не нужны.
+        """
+        wallet = object.__new__(cls)
+        wallet.currency_code = sys.intern(currency_code.upper())
+        wallet._balance = float(balance)
+        return wallet
+
     def _validate_amount(self, amount: float):
         """Валидация суммы операции."""
         if not isinstance(amount, (int, float)):
@@ -126,9 +166,12 @@ class Wallet:
     def withdraw(self, amount: float) -> None:
         """Снять средства с кошелька."""
         self._validate_amount(amount)
-        if self._balance < amount:
+        # Баланс читается один раз; ветка с исключением - последняя,
+        # как редкий (unlikely) путь
+        new_balance = self._balance - amount
+        if new_balance < 0:
             raise InsufficientFundsError(self.currency_code, self._balance, amount)
-        self._balance -= amount
+        self._balance = new_balance
     
     def get_balance_info(self) -> Dict[str, Union[str, float]]:
         """Получить информацию о балансе кошелька."""
@@ -139,7 +182,12 @@ class Wallet:
 
 class Portfolio:
     """Класс портфеля пользователя, управляющий всеми кошельками."""
-    
+
+    __slots__ = ("_user_id", "_wallets")
+
+    _user_id: int
+    _wallets: Dict[str, "Wallet"]
+
     def __init__(self, user_id: int):
         """
         Инициализация портфеля.
@@ -157,26 +205,37 @@ class Portfolio:
     
     @property
     def wallets(self) -> Dict[str, Wallet]:
-        """Геттер для кошельков (возвращает копию)."""
-        return self._wallets.copy()
-    
+        """Геттер для кошельков (представление без копирования)."""
+        return MappingProxyType(self._wallets)
+
     def add_currency(self, currency_code: str) -> Wallet:
         """
         Добавить новую валюту в портфель.
-        
+
         Args:
             currency_code: Код валюты
-            
+
         Returns:
             Wallet: Созданный или существующий кошелек
         """
+        return self.get_or_create_wallet(currency_code)
+
+    def get_or_create_wallet(self, currency_code: str) -> Wallet:
+        """
+        Получить кошелек по коду валюты, создав его при отсутствии.
+
+        Args:
+            currency_code: Код валюты
+
+        Returns:
+            Wallet: Существующий или созданный кошелек
+        """
         currency_code = currency_code.upper()
-        if currency_code in self._wallets:
-            return self._wallets[currency_code]
-        
-        new_wallet = Wallet(currency_code)
-        self._wallets[currency_code] = new_wallet
-        return new_wallet
+        wallet = self._wallets.get(currency_code)
+        if wallet is None:
+            wallet = Wallet(currency_code)
+            self._wallets[currency_code] = wallet
+        return wallet
     
     def get_wallet(self, currency_code: str) -> Wallet:
         """
@@ -196,31 +255,42 @@ class Portfolio:
             raise WalletNotFoundError(currency_code)
         return self._wallets[currency_code]
     
-    def get_total_value(self, exchange_rates: Dict[str, float], base_currency: str = "USD") -> float:
+    def get_total_value(
+        self, exchange_rates: Dict[Tuple[str, str], float], base_currency: str = "USD"
+    ) -> float:
         """
         Получить общую стоимость портфеля в базовой валюте.
-        
+
         Args:
-            exchange_rates: Словарь с курсами обмена
+            exchange_rates: Словарь с курсами обмена (ключи - пары кодов)
             base_currency: Базовая валюта для конвертации
-            
+
         Returns:
             float: Общая стоимость в базовой валюте
         """
-        base_currency = base_currency.upper()
+        # Коды кошельков интернированы, поэтому после интернирования
+        # базовой валюты совпадение проверяется сравнением указателей
+        base_currency = sys.intern(base_currency.upper())
         total_value = 0.0
-        
+        get_rate = exchange_rates.get
+
+        # Один проход по кошелькам, по одному поиску в словаре на пару;
+        # ключи-кортежи не требуют склейки строк
         for wallet in self._wallets.values():
-            if wallet.currency_code == base_currency:
-                total_value += wallet.balance
+            code = wallet.currency_code
+            balance = wallet.balance
+
+            if code is base_currency:
+                total_value += balance
+                continue
+
+            rate = get_rate((code, base_currency))
+            if rate is not None:
+                total_value += balance * rate
             else:
-                pair = f"{wallet.currency_code}_{base_currency}"
-                if pair in exchange_rates:
-                    total_value += wallet.balance * exchange_rates[pair]
-                else:
-                    # Попробуем обратную пару
-                    reverse_pair = f"{base_currency}_{wallet.currency_code}"
-                    if reverse_pair in exchange_rates:
-                        total_value += wallet.balance / exchange_rates[reverse_pair]
-        
+                # Попробуем обратную пару
+                reverse_rate = get_rate((base_currency, code))
+                if reverse_rate is not None:
+                    total_value += balance / reverse_rate
+
         return total_value
\ No newline at end of file
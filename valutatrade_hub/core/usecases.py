@@ -1,6 +1,6 @@
 import logging
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 from ..decorators import log_action
 from ..infra.database import DatabaseManager
@@ -13,7 +13,6 @@ from .exceptions import (
     DuplicateUsernameError,
     InvalidPasswordError,
     UserNotFoundError,
-    WalletNotFoundError,
 )
 from .models import User
 from .utils import (
@@ -98,8 +97,58 @@ class TradingUsecases:
     
     def __init__(self):
         self.db = DatabaseManager()
-        self.exchange_rates = get_exchange_rates()
-    
+        self._rates_snapshot = None
+        self._cross_rates: Dict[str, float] = {}
+
+    @property
+    def exchange_rates(self) -> Dict[Tuple[str, str], float]:
+        """Актуальный словарь курсов (читается через кеш по last_refresh)."""
+        return get_exchange_rates()
+
+    def _get_cross_rates(self) -> Dict[Tuple[str, str], float]:
+        """Получить таблицу кросс-курсов, пересчитав ее при обновлении курсов.
+
+        RatesCache возвращает один и тот же объект словаря, пока версия
+        не изменилась, поэтому достаточно сравнения по identity.
+        """
+        rates = get_exchange_rates()
+        if rates is not self._rates_snapshot:
+            self._cross_rates = self._build_cross_rates(rates)
+            self._rates_snapshot = rates
+        return self._cross_rates
+
+    @staticmethod
+    def _build_cross_rates(
+        exchange_rates: Dict[Tuple[str, str], float]
+    ) -> Dict[Tuple[str, str], float]:
+        """Построить полную таблицу кросс-курсов один раз.
+
+        Для N валют заранее вычисляются все пары: прямые курсы, обратные
+        (1/x) и триангуляция через USD. После этого поиск курса - один
+        поиск в словаре вместо перебора веток на каждый вызов. Ключи -
+        кортежи интернированных кодов, без склейки строк.
+        """
+        # Курс каждой валюты к USD (для триангуляции)
+        usd_rates = {"USD": 1.0}
+        for (from_currency, to_currency), rate in exchange_rates.items():
+            if to_currency == "USD" and rate:
+                usd_rates[from_currency] = rate
+            elif from_currency == "USD" and rate:
+                usd_rates[to_currency] = 1 / rate
+
+        # Прямые курсы имеют приоритет, затем обратные, затем триангуляция
+        cross = dict(exchange_rates)
+        for (from_currency, to_currency), rate in exchange_rates.items():
+            if rate:
+                cross.setdefault((to_currency, from_currency), 1 / rate)
+
+        for from_currency, from_rate in usd_rates.items():
+            for to_currency, to_rate in usd_rates.items():
+                if to_rate:
+                    cross.setdefault((from_currency, to_currency), from_rate / to_rate)
+
+        return cross
+
     def _get_exchange_rate(self, from_currency: str, to_currency: str) -> float:
         """
         Получить курс обмена между двумя валютами.
@@ -114,36 +163,10 @@ class TradingUsecases:
         Raises:
             ValueError: Если курс не найден
         """
-        # Прямой курс
-        direct_pair = f"{from_currency}_{to_currency}"
-        if direct_pair in self.exchange_rates:
-            return self.exchange_rates[direct_pair]
-        
-        # Обратный курс
-        reverse_pair = f"{to_currency}_{from_currency}"
-        if reverse_pair in self.exchange_rates:
-            return 1 / self.exchange_rates[reverse_pair]
-        
-        # Если базовая валюта USD или одна из валют - USD
-        base_currency = "USD"
-        if from_currency == base_currency:
-            pair = f"{to_currency}_{base_currency}"
-            if pair in self.exchange_rates:
-                return 1 / self.exchange_rates[pair]
-        elif to_currency == base_currency:
-            pair = f"{from_currency}_{base_currency}"
-            if pair in self.exchange_rates:
-                return self.exchange_rates[pair]
-        
-        # Попытка через базовую валюту
-        from_to_base = f"{from_currency}_{base_currency}"
-        to_to_base = f"{to_currency}_{base_currency}"
-        
-        if from_to_base in self.exchange_rates and to_to_base in self.exchange_rates:
-            from_rate = self.exchange_rates[from_to_base]
-            to_rate = self.exchange_rates[to_to_base]
-            return from_rate / to_rate
-        
+        rate = self._get_cross_rates().get((from_currency, to_currency))
+        if rate is not None:
+            return rate
+
         raise ValueError(f"Не удалось найти курс обмена между {from_currency} и {to_currency}")
     
     @log_action(verbose=True)
@@ -169,13 +192,10 @@ class TradingUsecases:
         
         # Загружаем портфель пользователя
         portfolio = load_user_portfolio(user_id)
-        
-        # Получаем или создаем кошелек для валюты
-        if currency_code not in portfolio.wallets:
-            portfolio.add_currency(currency_code)
-        
-        wallet = portfolio.get_wallet(currency_code)
-        
+
+        # Получаем или создаем кошелек для валюты (один поиск в словаре)
+        wallet = portfolio.get_or_create_wallet(currency_code)
+
         # Выполняем покупку
         wallet.deposit(amount)
         
@@ -226,13 +246,10 @@ class TradingUsecases:
         
         # Загружаем портфель пользователя
         portfolio = load_user_portfolio(user_id)
-        
-        # Проверяем наличие кошелька
-        if currency_code not in portfolio.wallets:
-            raise WalletNotFoundError(currency_code)
-        
+
+        # get_wallet сам поднимет WalletNotFoundError при отсутствии
         wallet = portfolio.get_wallet(currency_code)
-        
+
         # Выполняем продажу
         wallet.withdraw(amount)
         
@@ -271,27 +288,28 @@ class TradingUsecases:
         """
         # Загружаем портфель пользователя
         portfolio = load_user_portfolio(user_id)
-        
-        # Вычисляем общую стоимость в базовой валюте
-        total_value = portfolio.get_total_value(self.exchange_rates, base_currency)
-        
-        # Формируем результат
+
+        # Один проход: курс из предвычисленной таблицы, стоимость и итог
+        # считаются за раз, без повторного обхода в get_total_value
+        cross_rates = self._get_cross_rates()
         wallets_info = []
+        total_value = 0.0
+
         for currency_code, wallet in portfolio.wallets.items():
-            try:
-                rate = self._get_exchange_rate(currency_code, base_currency)
+            rate = cross_rates.get((currency_code, base_currency))
+            if rate is not None:
                 value_in_base = wallet.balance * rate
-            except ValueError:
-                rate = None
+                total_value += value_in_base
+            else:
                 value_in_base = None
-            
+
             wallets_info.append({
                 "currency": currency_code,
                 "balance": wallet.balance,
                 "rate": rate,
                 "value_in_base": value_in_base
             })
-        
+
         return {
             "user_id": user_id,
             "wallets": wallets_info,
@@ -328,8 +346,7 @@ class TradingUsecases:
             reverse_rate = None
         
         # Получаем информацию о времени обновления из базы данных
-        db = DatabaseManager()
-        rates_data = db.get_rates()
+        rates_data = self.db.get_rates()
         timestamp = rates_data.get("last_refresh", "Unknown")
         
         return {
@@ -348,33 +365,38 @@ class RatesUsecases:
         self.config = ParserConfig()
         self.storage = RatesStorage(
             rates_file=self.db.settings.RATES_FILE,
-            history_file=self.db.settings.EXCHANGE_RATES_FILE
+            history_file=self.db.settings.EXCHANGE_RATES_FILE,
+            max_history_bytes=self.db.settings.HISTORY_MAX_BYTES
         )
-    
-    def update_rates(self, source: Optional[str] = None) -> Dict[str, Any]:
+
+        # Обновитель и клиенты создаются один раз: их requests.Session
+        # живут между вызовами update_rates и переиспользуют
+        # keep-alive соединения вместо нового рукопожатия на каждый вызов
+        self.updater = RatesUpdater(
+            self.config, self.storage,
+            ttl_seconds=self.db.settings.RATES_TTL_SECONDS
+        )
+        self.updater.add_client(CoinGeckoClient(self.config))
+        self.updater.add_client(ExchangeRateApiClient(self.config))
+
+    def update_rates(self, source: Optional[str] = None,
+                     force: bool = False) -> Dict[str, Any]:
         """
         Обновить курсы валют.
-        
+
         Args:
             source: Источник для обновления (опционально)
-            
+            force: Обновить даже если курсы еще свежие
+
         Returns:
             Dict[str, Any]: Результат обновления
         """
         logger.info(f"Starting rates update with source: {source}")
-        
-        # Инициализируем клиентов
-        updater = RatesUpdater(self.config, self.storage)
-        updater.add_client(CoinGeckoClient(self.config))
-        updater.add_client(ExchangeRateApiClient(self.config))
-        
-        # Запускаем обновление
-        result = updater.run_update(source)
-        
-        # Перезагружаем курсы в памяти
-        global get_exchange_rates
-        get_exchange_rates = DatabaseManager().get_rates
-        
+
+        # Запускаем обновление: кеш курсов перечитается сам,
+        # так как в хранилище изменится last_refresh
+        result = self.updater.run_update(source, force=force)
+
         logger.info(f"Rates update completed: {result}")
         return result
     
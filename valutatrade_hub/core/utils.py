@@ -1,6 +1,7 @@
 import shlex
 import sys
-from typing import Any, Dict, List, Union
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple, Union
 
 from ..infra.database import DatabaseManager
 from .currencies import get_currency
@@ -8,36 +9,88 @@ from .exceptions import CurrencyNotFoundError
 from .models import Portfolio, Wallet
 
 
+@lru_cache(maxsize=1)
+def _db() -> DatabaseManager:
+    """Единственный экземпляр DatabaseManager для функций модуля."""
+    return DatabaseManager()
+
+
+class RatesCache:
+    """Кеш словаря курсов, привязанный к версии last_refresh.
+
+    Пока версия в хранилище не изменилась, возвращается один и тот же
+    объект словаря - потребители могут сверять его по identity, чтобы
+    понимать, когда нужно пересчитать производные структуры.
+
+    Ключи - кортежи (from, to) из интернированных строк: пара "AAA_BBB"
+    разбивается один раз при загрузке, и поиск курса обходится без
+    склейки f-строки и хеширования её целиком на каждый вызов.
+    """
+
+    def __init__(self):
+        self._version = None
+        self._rates: Dict[Tuple[str, str], float] = {}
+
+    def get(self) -> Dict[Tuple[str, str], float]:
+        """Вернуть словарь курсов, перечитав его только при смене версии."""
+        rates_data = _db().get_rates()
+        version = rates_data.get("last_refresh") if isinstance(rates_data, dict) else None
+
+        if version is None or version != self._version:
+            rates = {}
+            if "pairs" in rates_data:
+                for pair, data in rates_data["pairs"].items():
+                    if "rate" in data:
+                        from_currency, _, to_currency = pair.partition('_')
+                        key = (sys.intern(from_currency), sys.intern(to_currency))
+                        rates[key] = data["rate"]
+            self._rates = rates
+            self._version = version
+
+        return self._rates
+
+
+_rates_cache = RatesCache()
+
+
+# Платформа не меняется за время работы процесса - проверяем один раз
+_IS_WIN = sys.platform.startswith('win')
+
 def split_command(command: str) -> List[str]:
     """Разделить команду на аргументы с учетом кавычек."""
     try:
-        if sys.platform.startswith('win'):
-            # Windows-совместимая версия
-            return command.split()
-        else:
-            # Unix-версия
-            return shlex.split(command)
+        # В не-POSIX режиме shlex корректнее наивного split для Windows:
+        # кавычки учитываются при разбиении
+        return shlex.split(command, posix=not _IS_WIN)
     except ValueError:
         # Если shlex не может обработать команду
         return command.split()
 
+# Типы известных числовых аргументов CLI; остальные остаются строками.
+# Так не нужно пробовать int/float (и ловить исключения) на каждом значении,
+# а числовые на вид пароли и имена не превращаются в числа.
+_ARG_TYPES: Dict[str, Any] = {
+    "amount": float,
+    "top": int,
+}
+
 def parse_args(args_list: List[str]) -> Dict[str, Any]:
     """Разобрать аргументы командной строки в словарь."""
     args = {}
     i = 0
-    while i < len(args_list):
-        if args_list[i].startswith('--'):
-            key = args_list[i][2:]
-            if i + 1 < len(args_list) and not args_list[i + 1].startswith('--'):
+    n = len(args_list)
+    while i < n:
+        token = args_list[i]
+        if token.startswith('--'):
+            key = token[2:]
+            if i + 1 < n and not args_list[i + 1].startswith('--'):
                 value = args_list[i + 1]
-                # Пытаемся преобразовать в число, если возможно
-                try:
-                    if '.' in value:
-                        value = float(value)
-                    else:
-                        value = int(value)
-                except (ValueError, TypeError):
-                    pass
+                convert = _ARG_TYPES.get(key)
+                if convert is not None:
+                    try:
+                        value = convert(value)
+                    except (ValueError, TypeError):
+                        pass
                 args[key] = value
                 i += 2
             else:
@@ -47,9 +100,27 @@ def parse_args(args_list: List[str]) -> Dict[str, Any]:
             i += 1
     return args
 
+@lru_cache(maxsize=128)
+def parse_command_line(command_line: str) -> Tuple[str, Tuple[Tuple[str, Any], ...]]:
+    """Разобрать строку команды за один вызов: (команда, пары аргументов).
+
+    Результат кешируется по самой строке, поэтому повторяющиеся команды
+    из скриптов (например, опрос get-rate в цикле) парсятся один раз.
+    Аргументы возвращаются кортежем пар, чтобы значение было хешируемым.
+    """
+    tokens = split_command(command_line)
+    if not tokens:
+        return "", ()
+
+    command = tokens[0].lower()
+    args = parse_args(tokens[1:])
+    return command, tuple(args.items())
+
 def validate_currency_code(currency_code: str) -> str:
     """Проверить и нормализовать код валюты."""
-    currency_code = currency_code.strip().upper()
+    # Интернирование: последующие поиски по словарям курсов и кошельков
+    # срезаются до сравнения указателей
+    currency_code = sys.intern(currency_code.strip().upper())
     if not currency_code:
         raise ValueError("Код валюты не может быть пустым")
     
@@ -73,22 +144,16 @@ def validate_positive_float(value: Union[str, float]) -> float:
     
     return float_value
 
-def get_exchange_rates() -> Dict[str, float]:
-    """Получить курсы обмена из базы данных."""
-    db = DatabaseManager()
-    rates_data = db.get_rates()
-    rates = {}
-    
-    if "pairs" in rates_data:
-        for pair, data in rates_data["pairs"].items():
-            if "rate" in data:
-                rates[pair] = data["rate"]
-    
-    return rates
+def get_exchange_rates() -> Dict[Tuple[str, str], float]:
+    """Получить курсы обмена из базы данных (с кешированием по last_refresh)."""
+    return _rates_cache.get()
+
+# Криптовалюты выводятся с повышенной точностью
+_CRYPTO_DISPLAY_CODES = frozenset(("BTC", "ETH", "SOL"))
 
 def format_currency_amount(amount: float, currency_code: str) -> str:
     """Отформатировать сумму валюты для отображения."""
-    if currency_code in ["BTC", "ETH", "SOL"]:
+    if currency_code in _CRYPTO_DISPLAY_CODES:
         return f"{amount:.4f}"
     elif currency_code == "USD":
         return f"{amount:,.2f}"
@@ -97,8 +162,7 @@ def format_currency_amount(amount: float, currency_code: str) -> str:
 
 def load_user_portfolio(user_id: int) -> Portfolio:
     """Загрузить портфель пользователя из базы данных."""
-    db = DatabaseManager()
-    portfolio_data = db.get_portfolio(user_id)
+    portfolio_data = _db().get_portfolio(user_id)
     
     if not portfolio_data:
         portfolio = Portfolio(user_id)
@@ -106,23 +170,20 @@ def load_user_portfolio(user_id: int) -> Portfolio:
     
     portfolio = Portfolio(user_id)
     
-    # Загружаем кошельки
+    # Загружаем кошельки: данные из БД доверенные, валидация не нужна
     for currency_code, wallet_data in portfolio_data.get("wallets", {}).items():
-        wallet = Wallet(currency_code)
-        wallet.balance = wallet_data.get("balance", 0.0)
-        portfolio._wallets[currency_code] = wallet
+        portfolio._wallets[currency_code] = Wallet._from_raw(
+            currency_code, wallet_data.get("balance", 0.0)
+        )
     
     return portfolio
 
 def save_user_portfolio(user_id: int, portfolio: Portfolio):
     """Сохранить портфель пользователя в базу данных."""
-    db = DatabaseManager()
-    
-    # Преобразуем портфель в формат для сохранения
-    wallets_data = {}
-    for currency_code, wallet in portfolio.wallets.items():
-        wallets_data[currency_code] = {
-            "balance": wallet.balance
-        }
-    
-    db.update_portfolio(user_id, wallets_data)
\ No newline at end of file
+    # Преобразуем портфель в формат для сохранения одним проходом
+    wallets_data = {
+        currency_code: {"balance": wallet.balance}
+        for currency_code, wallet in portfolio.wallets.items()
+    }
+
+    _db().update_portfolio(user_id, wallets_data)
\ No newline at end of file
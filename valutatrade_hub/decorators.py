@@ -1,4 +1,5 @@
 import functools
+import inspect
 import logging
 import time
 
@@ -7,48 +8,77 @@ logger = logging.getLogger("actions")
 def log_action(verbose=False):
     """Декоратор для логирования действий пользователя."""
     def decorator(func):
+        # Всё, что зависит только от функции, вычисляем один раз
+        # при декорировании, а не на каждый вызов
+        action_name = func.__name__.upper()
+        param_index = {
+            name: i for i, name in enumerate(inspect.signature(func).parameters)
+        }
+
+        def _argument(name, args, kwargs):
+            """Достать аргумент по имени из kwargs или позиционных args."""
+            if name in kwargs:
+                return kwargs[name]
+            index = param_index.get(name)
+            if index is not None and index < len(args):
+                return args[index]
+            return None
+
         @functools.wraps(func)
         def wrapper(*args, **kwargs):
-            start_time = time.time()
-            action_name = func.__name__.upper()
-            user_id = kwargs.get('user_id') or (args[0].user_id if hasattr(args[0], 'user_id') else None)
-            username = kwargs.get('username') or (args[0].username if hasattr(args[0], 'username') else None)
-            currency_code = kwargs.get('currency_code') or kwargs.get('from_code')
-            amount = kwargs.get('amount')
-            base_currency = kwargs.get('base_currency', 'USD')
-            
+            # Выключенное логирование не должно стоить ничего: проверяем
+            # уровни один раз и при полном отключении сразу зовем функцию
+            info_enabled = logger.isEnabledFor(logging.INFO)
+            error_enabled = logger.isEnabledFor(logging.ERROR)
+            if not verbose and not info_enabled and not error_enabled:
+                return func(*args, **kwargs)
+
+            start_time = time.perf_counter()
+
             try:
                 result = func(*args, **kwargs)
-                execution_time = time.time() - start_time
-                status = "OK"
-                
-                log_message = (
-                    f"{action_name} user_id='{user_id}' username='{username}' "
-                    f"currency='{currency_code}' amount={amount} base='{base_currency}' "
-                    f"result={status} time={execution_time:.3f}s"
-                )
-                
-                if verbose and hasattr(result, 'wallet') and action_name in ['BUY', 'SELL']:
-                    wallet = result.wallet
-                    balance_before = wallet.balance - (amount if action_name == 'BUY' else -amount)
-                    log_message += f" balance_before={balance_before:.4f} balance_after={wallet.balance:.4f}"
-                
-                logger.info(log_message)
+
+                if info_enabled:
+                    execution_time = time.perf_counter() - start_time
+                    user_id = _argument('user_id', args, kwargs)
+                    username = _argument('username', args, kwargs)
+                    currency_code = _argument('currency_code', args, kwargs) or _argument('from_code', args, kwargs)
+                    amount = _argument('amount', args, kwargs)
+                    base_currency = kwargs.get('base_currency', 'USD')
+
+                    log_message = (
+                        f"{action_name} user_id='{user_id}' username='{username}' "
+                        f"currency='{currency_code}' amount={amount} base='{base_currency}' "
+                        f"result=OK time={execution_time:.3f}s"
+                    )
+
+                    if verbose and hasattr(result, 'wallet') and action_name in ['BUY', 'SELL']:
+                        wallet = result.wallet
+                        balance_before = wallet.balance - (amount if action_name == 'BUY' else -amount)
+                        log_message += f" balance_before={balance_before:.4f} balance_after={wallet.balance:.4f}"
+
+                    logger.info(log_message)
+
                 return result
-                
+
             except Exception as e:
-                execution_time = time.time() - start_time
-                error_type = type(e).__name__
-                error_message = str(e)
-                
-                log_message = (
-                    f"{action_name} user_id='{user_id}' username='{username}' "
-                    f"currency='{currency_code}' amount={amount} base='{base_currency}' "
-                    f"result=ERROR error_type='{error_type}' error_message='{error_message}' "
-                    f"time={execution_time:.3f}s"
-                )
-                logger.error(log_message)
+                if error_enabled:
+                    execution_time = time.perf_counter() - start_time
+                    user_id = _argument('user_id', args, kwargs)
+                    username = _argument('username', args, kwargs)
+                    currency_code = _argument('currency_code', args, kwargs) or _argument('from_code', args, kwargs)
+                    amount = _argument('amount', args, kwargs)
+                    base_currency = kwargs.get('base_currency', 'USD')
+                    error_type = type(e).__name__
+
+                    log_message = (
+                        f"{action_name} user_id='{user_id}' username='{username}' "
+                        f"currency='{currency_code}' amount={amount} base='{base_currency}' "
+                        f"result=ERROR error_type='{error_type}' error_message='{e}' "
+                        f"time={execution_time:.3f}s"
+                    )
+                    logger.error(log_message)
                 raise
-                
+
         return wrapper
-    return decorator
\ No newline at end of file
+    return decorator
@@ -1,18 +1,28 @@
-import json
+import mmap
+import os
+import secrets
 import threading
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
+from hashlib import pbkdf2_hmac
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterator, List, Optional
 
+from ..core.models import PBKDF2_ITERATIONS
+from . import jsonio
 from .settings import SettingsLoader
 
+# С этого размера файл читается через mmap: парсер получает буфер без
+# промежуточной копии всего содержимого. Для мелких файлов обычный
+# read() дешевле, чем настройка отображения
+MMAP_MIN_SIZE = 64 * 1024
+
 
 class DatabaseManager:
     """Singleton класс для управления данными в JSON файлах."""
     
     _instance = None
-    _lock = threading.Lock()  # Блокировка для потокобезопасности
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(DatabaseManager, cls).__new__(cls)
@@ -24,88 +34,173 @@ class DatabaseManager:
             return
         
         self.settings = SettingsLoader()
-        
+
+        # Блокировка на файл вместо одной глобальной: запись пользователя
+        # не сериализуется с записью портфеля или курсов. RLock позволяет
+        # писателю безопасно вызывать методы по тому же файлу повторно
+        self._file_locks: Dict[Path, threading.RLock] = {
+            path: threading.RLock()
+            for path in (
+                self.settings.USERS_FILE,
+                self.settings.PORTFOLIOS_FILE,
+                self.settings.RATES_FILE,
+                self.settings.EXCHANGE_RATES_FILE,
+            )
+        }
+
+        # Кеш разобранных файлов: путь -> (st_mtime_ns, данные).
+        # Пока mtime не изменился, повторные чтения не открывают файл
+        self._cache: Dict[Path, tuple] = {}
+
+        # Индексы поверх кеша: поиск пользователя/портфеля за O(1)
+        # вместо линейного прохода по списку. Снимок (snapshot) хранит
+        # список, по которому индекс построен: _read_json возвращает тот
+        # же объект до смены mtime, поэтому валидность проверяется по is
+        self._users_snapshot: Optional[List[Dict]] = None
+        self._users_by_name: Dict[str, Dict] = {}
+        self._users_by_id: Dict[int, Dict] = {}
+        self._next_user_id = 1
+        self._portfolios_snapshot: Optional[List[Dict]] = None
+        self._portfolios_by_id: Dict[int, Dict] = {}
+
+        # Момент (по монотонным часам), до которого курсы заведомо
+        # свежие: до его истечения are_rates_fresh не трогает диск
+        self._rates_fresh_until: float = 0.0
+
         # Создаем пустые файлы если их нет
         self._init_data_files()
-        
+
         self._initialized = True
     
+    @staticmethod
+    def _create_if_missing(file_path: Path, make_payload) -> None:
+        """Создать файл с начальным содержимым, если его еще нет.
+
+        O_CREAT|O_EXCL вместо пары exists()+open(): один системный вызов
+        на горячем пути и нет TOCTOU-гонки между проверкой и созданием.
+        Содержимое вычисляется только когда файл действительно создается.
+        """
+        try:
+            fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+        except FileExistsError:
+            return
+        try:
+            os.write(fd, make_payload())
+        finally:
+            os.close(fd)
+
+    @staticmethod
+    def _initial_rates_payload() -> bytes:
+        """Собрать начальное содержимое файла курсов."""
+        # last_refresh всегда в UTC: по нему считают возраст
+        # are_rates_fresh и RatesUpdater._rates_fresh
+        now_iso = datetime.utcnow().isoformat()
+        initial_rates = {
+            "pairs": {
+                "EUR_USD": {"rate": 1.0786, "updated_at": now_iso, "source": "default"},
+                "BTC_USD": {"rate": 59337.21, "updated_at": now_iso, "source": "default"},
+                "RUB_USD": {"rate": 0.01016, "updated_at": now_iso, "source": "default"},
+                "ETH_USD": {"rate": 3720.00, "updated_at": now_iso, "source": "default"}
+            },
+            "last_refresh": now_iso
+        }
+        return jsonio.dumps_pretty(initial_rates)
+
     def _init_data_files(self):
         """Инициализировать файлы данных если их нет."""
         # Пользователи
-        if not self.settings.USERS_FILE.exists():
-            with open(self.settings.USERS_FILE, 'w', encoding='utf-8') as f:
-                json.dump([], f, indent=2)
-        
+        self._create_if_missing(self.settings.USERS_FILE, lambda: jsonio.dumps_pretty([]))
+
         # Портфели
-        if not self.settings.PORTFOLIOS_FILE.exists():
-            with open(self.settings.PORTFOLIOS_FILE, 'w', encoding='utf-8') as f:
-                json.dump([], f, indent=2)
-        
+        self._create_if_missing(self.settings.PORTFOLIOS_FILE, lambda: jsonio.dumps_pretty([]))
+
         # Курсы валют
-        if not self.settings.RATES_FILE.exists():
-            initial_rates = {
-                "pairs": {
-                    "EUR_USD": {"rate": 1.0786, "updated_at": datetime.now().isoformat(), "source": "default"},
-                    "BTC_USD": {"rate": 59337.21, "updated_at": datetime.now().isoformat(), "source": "default"},
-                    "RUB_USD": {"rate": 0.01016, "updated_at": datetime.now().isoformat(), "source": "default"},
-                    "ETH_USD": {"rate": 3720.00, "updated_at": datetime.now().isoformat(), "source": "default"}
-                },
-                "last_refresh": datetime.now().isoformat()
-            }
-            with open(self.settings.RATES_FILE, 'w', encoding='utf-8') as f:
-                json.dump(initial_rates, f, indent=2)
-        
-        # История курсов
-        if not self.settings.EXCHANGE_RATES_FILE.exists():
-            with open(self.settings.EXCHANGE_RATES_FILE, 'w', encoding='utf-8') as f:
-                json.dump([], f, indent=2)
+        self._create_if_missing(self.settings.RATES_FILE, self._initial_rates_payload)
+
+        # История курсов (NDJSON - пустой файл без записей)
+        self._create_if_missing(self.settings.EXCHANGE_RATES_FILE, lambda: b"")
     
     def _read_json(self, file_path: Path) -> Any:
-        """Прочитать данные из JSON файла."""
+        """Прочитать данные из JSON файла (с кешем по mtime).
+
+        Файл открывается и парсится только если его st_mtime_ns изменился
+        с прошлого чтения; иначе возвращается уже разобранный объект.
+        """
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError):
+            st = os.stat(file_path)
+        except OSError:
             return []
-    
+        mtime_ns = st.st_mtime_ns
+
+        entry = self._cache.get(file_path)
+        if entry is not None and entry[0] == mtime_ns:
+            return entry[1]
+
+        try:
+            with open(file_path, 'rb') as f:
+                if st.st_size >= MMAP_MIN_SIZE:
+                    # Крупный файл: парсим прямо из отображения,
+                    # без промежуточной копии содержимого
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        data = jsonio.loads(mm)
+                else:
+                    data = jsonio.loads(f.read())
+        except (ValueError, OSError):
+            return []
+
+        self._cache[file_path] = (mtime_ns, data)
+        return data
+
     def _write_json(self, file_path: Path, data: Any):
-        """Записать данные в JSON файл."""
-        with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        """Записать данные в JSON файл (атомарно, со сквозным обновлением кеша)."""
+        jsonio.atomic_write_json(file_path, data)
+        self._cache[file_path] = (os.stat(file_path).st_mtime_ns, data)
     
+    def _get_users_index(self) -> Dict[str, Dict]:
+        """Получить индекс пользователей по имени, перестроив при смене файла."""
+        users = self._read_json(self.settings.USERS_FILE)
+        if users is not self._users_snapshot:
+            self._users_by_name = {user["username"]: user for user in users}
+            self._users_by_id = {user["user_id"]: user for user in users}
+            self._next_user_id = max(self._users_by_id, default=0) + 1
+            self._users_snapshot = users
+        return self._users_by_name
+
+    def _get_portfolios_index(self) -> Dict[int, Dict]:
+        """Получить индекс портфелей по user_id, перестроив при смене файла."""
+        portfolios = self._read_json(self.settings.PORTFOLIOS_FILE)
+        if portfolios is not self._portfolios_snapshot:
+            self._portfolios_by_id = {p["user_id"]: p for p in portfolios}
+            self._portfolios_snapshot = portfolios
+        return self._portfolios_by_id
+
     def get_all_users(self) -> List[Dict]:
         """Получить всех пользователей."""
-        with self._lock:
-            return self._read_json(self.settings.USERS_FILE)
-    
+        return self._read_json(self.settings.USERS_FILE)
+
     def get_user_by_username(self, username: str) -> Optional[Dict]:
         """Получить пользователя по имени."""
-        users = self.get_all_users()
-        for user in users:
-            if user["username"] == username:
-                return user
-        return None
-    
+        return self._get_users_index().get(username)
+
     def create_user(self, username: str, password: str) -> Dict:
         """Создать нового пользователя."""
-        with self._lock:
-            users = self.get_all_users()
-            
-            # Проверка на уникальность имени
-            if any(user["username"] == username for user in users):
+        with self._file_locks[self.settings.USERS_FILE]:
+            users = self._read_json(self.settings.USERS_FILE)
+            users_by_name = self._get_users_index()
+
+            # Проверка на уникальность имени - один поиск в индексе
+            if username in users_by_name:
                 raise ValueError(f"Пользователь с именем '{username}' уже существует")
-            
+
             # Генерация ID
-            user_id = max([user["user_id"] for user in users], default=0) + 1
-            
+            user_id = self._next_user_id
+            self._next_user_id += 1
+
             # Генерация соли и хеширование пароля
-            import random
-            import string
-            from hashlib import sha256
-            
-            salt = ''.join(random.choices(string.ascii_letters + string.digits, k=16))
-            hashed_password = sha256((password + salt).encode()).hexdigest()
+            salt = secrets.token_urlsafe(12)
+            hashed_password = pbkdf2_hmac(
+                'sha256', password.encode(), salt.encode(), PBKDF2_ITERATIONS
+            ).hex()
             
             # Создание пользователя
             new_user = {
@@ -116,54 +211,58 @@ class DatabaseManager:
                 "registration_date": datetime.now().isoformat()
             }
             
+            # Кеш хранит тот же объект списка, поэтому индексы
+            # дополняются на месте, без перестройки
             users.append(new_user)
+            users_by_name[username] = new_user
+            self._users_by_id[user_id] = new_user
             self._write_json(self.settings.USERS_FILE, users)
-            
+
             # Создание пустого портфеля для пользователя
             self.create_portfolio(user_id)
-            
+
             return new_user
-    
+
     def create_portfolio(self, user_id: int):
         """Создать пустой портфель для пользователя."""
-        with self._lock:
+        with self._file_locks[self.settings.PORTFOLIOS_FILE]:
             portfolios = self._read_json(self.settings.PORTFOLIOS_FILE)
-            
+            portfolios_by_id = self._get_portfolios_index()
+
             # Проверка, не существует ли уже портфель
-            if any(portfolio["user_id"] == user_id for portfolio in portfolios):
+            if user_id in portfolios_by_id:
                 return
-            
+
             new_portfolio = {
                 "user_id": user_id,
                 "wallets": {}
             }
-            
+
             portfolios.append(new_portfolio)
+            portfolios_by_id[user_id] = new_portfolio
             self._write_json(self.settings.PORTFOLIOS_FILE, portfolios)
-    
+
     def get_portfolio(self, user_id: int) -> Optional[Dict]:
         """Получить портфель пользователя."""
-        portfolios = self._read_json(self.settings.PORTFOLIOS_FILE)
-        for portfolio in portfolios:
-            if portfolio["user_id"] == user_id:
-                return portfolio
-        return None
-    
+        return self._get_portfolios_index().get(user_id)
+
     def update_portfolio(self, user_id: int, wallets: Dict[str, Dict]):
         """Обновить портфель пользователя."""
-        with self._lock:
+        with self._file_locks[self.settings.PORTFOLIOS_FILE]:
             portfolios = self._read_json(self.settings.PORTFOLIOS_FILE)
-            for portfolio in portfolios:
-                if portfolio["user_id"] == user_id:
-                    portfolio["wallets"] = wallets
-                    self._write_json(self.settings.PORTFOLIOS_FILE, portfolios)
-                    return
-            # Если портфель не найден, создаем его
-            new_portfolio = {
-                "user_id": user_id,
-                "wallets": wallets
-            }
-            portfolios.append(new_portfolio)
+            portfolios_by_id = self._get_portfolios_index()
+
+            portfolio = portfolios_by_id.get(user_id)
+            if portfolio is not None:
+                portfolio["wallets"] = wallets
+            else:
+                # Если портфель не найден, создаем его
+                portfolio = {
+                    "user_id": user_id,
+                    "wallets": wallets
+                }
+                portfolios.append(portfolio)
+                portfolios_by_id[user_id] = portfolio
             self._write_json(self.settings.PORTFOLIOS_FILE, portfolios)
     
     def get_rates(self) -> Dict[str, Any]:
@@ -172,29 +271,70 @@ class DatabaseManager:
     
     def update_rates(self, rates_data: Dict[str, Any]):
         """Обновить курсы валют в кеше."""
-        with self._lock:
+        with self._file_locks[self.settings.RATES_FILE]:
             self._write_json(self.settings.RATES_FILE, rates_data)
+            # Срок свежести пересчитается при следующей проверке
+            self._rates_fresh_until = 0.0
     
+    def iter_exchange_rates_history(self) -> Iterator[Dict]:
+        """Итерироваться по записям истории, не загружая файл целиком."""
+        try:
+            with open(self.settings.EXCHANGE_RATES_FILE, 'rb') as f:
+                for line in f:
+                    if line.strip():
+                        yield jsonio.loads(line)
+        except (ValueError, FileNotFoundError):
+            return
+
     def get_exchange_rates_history(self) -> List[Dict]:
-        """Получить историю курсов обмена."""
-        return self._read_json(self.settings.EXCHANGE_RATES_FILE)
-    
+        """Получить всю историю курсов обмена списком."""
+        return list(self.iter_exchange_rates_history())
+
+    def _rotate_history_if_needed(self):
+        """Переименовать файл истории в .1, если он превысил порог."""
+        history_file = self.settings.EXCHANGE_RATES_FILE
+        try:
+            if os.stat(history_file).st_size < self.settings.HISTORY_MAX_BYTES:
+                return
+        except OSError:
+            return
+        history_file.replace(history_file.with_suffix(history_file.suffix + '.1'))
+
     def add_exchange_rate_record(self, record: Dict):
-        """Добавить запись в историю курсов обмена."""
-        with self._lock:
-            history = self.get_exchange_rates_history()
-            history.append(record)
-            self._write_json(self.settings.EXCHANGE_RATES_FILE, history)
+        """Добавить запись в историю курсов обмена.
+
+        История хранится построчно (NDJSON): запись - это один append,
+        без чтения и перезаписи всего файла.
+        """
+        with self._file_locks[self.settings.EXCHANGE_RATES_FILE]:
+            self._rotate_history_if_needed()
+            with open(self.settings.EXCHANGE_RATES_FILE, 'ab') as f:
+                f.write(jsonio.dumps_line(record) + b"\n")
     
     def are_rates_fresh(self) -> bool:
-        """Проверить, достаточно ли свежие курсы."""
+        """Проверить, достаточно ли свежие курсы.
+
+        Положительный ответ кешируется по монотонным часам: пока срок
+        свежести не истек, проверка - одно сравнение float, без чтения
+        файла и разбора ISO-метки. Запись курсов сбрасывает кеш.
+        """
+        now = time.monotonic()
+        if now < self._rates_fresh_until:
+            return True
+
         rates = self.get_rates()
         if not rates or "last_refresh" not in rates:
             return False
-        
+
         try:
             last_refresh = datetime.fromisoformat(rates["last_refresh"])
-            ttl = timedelta(seconds=self.settings.RATES_TTL_SECONDS)
-            return datetime.now() - last_refresh < ttl
         except ValueError:
-            return False
\ No newline at end of file
+            return False
+
+        # last_refresh пишется в UTC, поэтому возраст тоже считается от utcnow
+        age_seconds = (datetime.utcnow() - last_refresh).total_seconds()
+        ttl_seconds = self.settings.RATES_TTL_SECONDS
+        if age_seconds < ttl_seconds:
+            self._rates_fresh_until = now + (ttl_seconds - age_seconds)
+            return True
+        return False
\ No newline at end of file
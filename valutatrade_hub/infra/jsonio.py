@@ -0,0 +1,75 @@
+"""Обертки над json с опциональным ускорением через orjson.
+
+Если orjson установлен, сериализация и парсинг выполняются его
+C-реализацией; иначе используется стандартный json с теми же
+сигнатурами. Зависимость опциональная - без нее все работает так же,
+только медленнее.
+
+Обе реализации работают с байтами: файлы открываются в бинарном
+режиме, dumps_pretty/dumps_line возвращают уже закодированный результат.
+"""
+
+import json
+import mmap
+import os
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+if orjson is not None:
+
+    def loads(data):
+        """Разобрать JSON из строки, байтов или буфера."""
+        if isinstance(data, mmap.mmap):
+            # orjson не принимает mmap напрямую - оборачиваем в memoryview
+            # (освобождаем его до закрытия отображения)
+            with memoryview(data) as view:
+                return orjson.loads(view)
+        return orjson.loads(data)
+
+    def dumps_pretty(data) -> bytes:
+        """Сериализовать с отступами (для файлов данных)."""
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS)
+
+    def dumps_line(data) -> bytes:
+        """Сериализовать компактно в одну строку (для NDJSON)."""
+        return orjson.dumps(data)
+
+else:
+
+    def loads(data):
+        """Разобрать JSON из строки, байтов или буфера."""
+        if not isinstance(data, (str, bytes, bytearray)):
+            # Буферы (mmap, memoryview) приводим к байтам
+            data = bytes(data)
+        return json.loads(data)
+
+    def dumps_pretty(data) -> bytes:
+        """Сериализовать с отступами (для файлов данных)."""
+        return json.dumps(data, indent=2, ensure_ascii=False).encode('utf-8')
+
+    def dumps_line(data) -> bytes:
+        """Сериализовать компактно в одну строку (для NDJSON)."""
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+
+def atomic_write_json(path, data, durable: bool = True):
+    """Атомарно записать JSON файл: tmp-файл, fsync, os.replace.
+
+    Читатели в любой момент видят либо старое, либо новое содержимое -
+    обрыв посреди записи не оставляет усеченного файла. Один fsync
+    перед заменой гарантирует, что данные легли на диск; частые
+    некритичные записи могут передать durable=False и пропустить его.
+    """
+    tmp_path = path.with_suffix(path.suffix + '.tmp')
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, dumps_pretty(data))
+        if durable:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, path)
@@ -1,60 +1,98 @@
 import os
+from functools import cached_property
 from pathlib import Path
 
-from dotenv import load_dotenv
+
+def _load_env():
+    """Подхватить переменные из .env, если установлен python-dotenv.
+
+    Импорт ленивый: поиск .env по файловой системе и сам импорт
+    выполняются один раз при создании настроек, а не при импорте модуля.
+    """
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
 
 
 class SettingsLoader:
     """Singleton класс для загрузки и управления настройками."""
-    
+
     _instance = None
-    
+
     def __new__(cls):
         if cls._instance is None:
             cls._instance = super(SettingsLoader, cls).__new__(cls)
             cls._instance._initialized = False
         return cls._instance
-    
+
     def __init__(self):
         if self._initialized:
             return
-        
+
         # Загружаем переменные окружения
-        load_dotenv()
-        
-        # Базовые пути
+        _load_env()
+
+        # Базовый путь; каталоги данных и логов создаются лениво,
+        # при первом обращении к соответствующим атрибутам
         self.BASE_DIR = Path(__file__).resolve().parent.parent.parent
-        self.DATA_DIR = self.BASE_DIR / "data"
-        self.LOGS_DIR = self.BASE_DIR / "logs"
-        
-        # Создаем директории если их нет
-        self.DATA_DIR.mkdir(exist_ok=True)
-        self.LOGS_DIR.mkdir(exist_ok=True)
-        
-        # Файлы данных
-        self.USERS_FILE = self.DATA_DIR / "users.json"
-        self.PORTFOLIOS_FILE = self.DATA_DIR / "portfolios.json"
-        self.RATES_FILE = self.DATA_DIR / "rates.json"
-        self.EXCHANGE_RATES_FILE = self.DATA_DIR / "exchange_rates.json"
-        
+
         # Параметры приложения
         self.DEFAULT_BASE_CURRENCY = "USD"
         self.RATES_TTL_SECONDS = 300  # 5 минут
-        
+        self.HISTORY_MAX_BYTES = 10485760  # 10MB, порог ротации истории
+
         # API ключи
         self.EXCHANGERATE_API_KEY = os.getenv("EXCHANGERATE_API_KEY", "")
-        
+
         # Логирование
         self.LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
         self.LOG_MAX_BYTES = 10485760  # 10MB
         self.LOG_BACKUP_COUNT = 5
-        
+
         self._initialized = True
-    
+
+    @cached_property
+    def DATA_DIR(self) -> Path:
+        """Каталог данных (создается при первом обращении)."""
+        path = self.BASE_DIR / "data"
+        path.mkdir(exist_ok=True)
+        return path
+
+    @cached_property
+    def LOGS_DIR(self) -> Path:
+        """Каталог логов (создается при первом обращении)."""
+        path = self.BASE_DIR / "logs"
+        path.mkdir(exist_ok=True)
+        return path
+
+    @cached_property
+    def USERS_FILE(self) -> Path:
+        return self.DATA_DIR / "users.json"
+
+    @cached_property
+    def PORTFOLIOS_FILE(self) -> Path:
+        return self.DATA_DIR / "portfolios.json"
+
+    @cached_property
+    def RATES_FILE(self) -> Path:
+        return self.DATA_DIR / "rates.json"
+
+    @cached_property
+    def EXCHANGE_RATES_FILE(self) -> Path:
+        # История хранится построчно (NDJSON): запись - это append одной строки
+        return self.DATA_DIR / "exchange_rates.ndjson"
+
     def get(self, key: str, default=None):
         """Получить значение настройки по ключу."""
         return getattr(self, key, default)
-    
+
     def reload(self):
         """Перезагрузить настройки."""
-        self.__init__()
\ No newline at end of file
+        # Сбрасываем закешированные пути, чтобы они пересчитались
+        for name in ("DATA_DIR", "LOGS_DIR", "USERS_FILE",
+                     "PORTFOLIOS_FILE", "RATES_FILE", "EXCHANGE_RATES_FILE"):
+            self.__dict__.pop(name, None)
+        self._initialized = False
+        self.__init__()
@@ -1,26 +1,50 @@
 import logging
+import time
 from abc import ABC, abstractmethod
-from datetime import datetime
+from email.utils import parsedate_to_datetime
 from typing import Any, Dict
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 from ..core.exceptions import ApiRequestError
+from ..infra import jsonio
 from .config import ParserConfig
 
 logger = logging.getLogger(__name__)
 
 class BaseApiClient(ABC):
     """Абстрактный базовый класс для API клиентов."""
-    
+
     def __init__(self, config: ParserConfig):
         """
         Инициализация API клиента.
-        
+
         Args:
             config: Конфигурация
         """
         self.config = config
+
+        # Одна сессия на клиента: повторные запросы переиспользуют
+        # прогретое TCP/TLS-соединение вместо нового рукопожатия,
+        # а временные 5xx ретраятся адаптером, не долетая до вызывающего
+        self.session = requests.Session()
+        self.session.headers.update({
+            "User-Agent": "valutatrade/1.0",
+            "Accept-Encoding": "gzip",
+        })
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=10,
+            max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[502, 503, 504]),
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def close(self):
+        """Закрыть сессию и освободить соединения."""
+        self.session.close()
     
     @abstractmethod
     def fetch_rates(self) -> Dict[str, Any]:
@@ -43,23 +67,20 @@ class CoinGeckoClient(BaseApiClient):
             Dict[str, Any]: Словарь с курсами
         """
         try:
-            # Формируем список ID для запроса
-            crypto_ids = [self.config.CRYPTO_ID_MAP[code] for code in self.config.CRYPTO_CURRENCIES 
-                         if code in self.config.CRYPTO_ID_MAP]
-            
-            if not crypto_ids:
+            # Список ID и базовая валюта вычислены один раз в конфиге
+            if not self.config.crypto_ids_csv:
                 logger.warning("No valid cryptocurrency IDs found for CoinGecko request")
                 return {}
-            
-            # Формируем параметры запроса
+
+            base_lower = self.config.base_currency_lower
             params = {
-                'ids': ','.join(crypto_ids),
-                'vs_currencies': self.config.BASE_CURRENCY.lower()
+                'ids': self.config.crypto_ids_csv,
+                'vs_currencies': base_lower
             }
-            
+
             # Отправляем запрос
-            logger.info(f"Fetching cryptocurrency rates from CoinGecko for {len(crypto_ids)} currencies")
-            response = requests.get(
+            logger.info("Fetching cryptocurrency rates from CoinGecko")
+            response = self.session.get(
                 self.config.COINGECKO_URL,
                 params=params,
                 timeout=self.config.REQUEST_TIMEOUT
@@ -68,17 +89,18 @@ class CoinGeckoClient(BaseApiClient):
             # Проверяем статус ответа
             response.raise_for_status()
             
-            # Парсим ответ
-            data = response.json()
+            # Парсим ответ (jsonio использует orjson, если тот установлен)
+            data = jsonio.loads(response.content)
             rates = {}
-            timestamp = datetime.utcnow().strftime(self.config.DATETIME_FORMAT)
+            # time.strftime по gmtime дешевле: без объекта datetime
+            timestamp = time.strftime(self.config.DATETIME_FORMAT, time.gmtime())
             
             # Преобразуем данные в единый формат
             for code in self.config.CRYPTO_CURRENCIES:
                 if code in self.config.CRYPTO_ID_MAP:
                     crypto_id = self.config.CRYPTO_ID_MAP[code]
-                    if crypto_id in data and self.config.BASE_CURRENCY.lower() in data[crypto_id]:
-                        rate = data[crypto_id][self.config.BASE_CURRENCY.lower()]
+                    if crypto_id in data and base_lower in data[crypto_id]:
+                        rate = data[crypto_id][base_lower]
                         pair = f"{code}_{self.config.BASE_CURRENCY}"
                         rates[pair] = {
                             "rate": rate,
@@ -118,19 +140,19 @@ class ExchangeRateApiClient(BaseApiClient):
                 logger.error(error_msg)
                 raise ApiRequestError(error_msg)
             
-            # Формируем URL запроса
-            url = f"{self.config.EXCHANGERATE_API_URL}/{self.config.EXCHANGERATE_API_KEY}/latest/{self.config.BASE_CURRENCY}"
-            
+            # URL запроса предвычислен в конфиге
+            url = self.config.exchangerate_latest_url
+
             # Отправляем запрос
             logger.info(f"Fetching fiat currency rates from ExchangeRate-API for base currency {self.config.BASE_CURRENCY}")
-            response = requests.get(url, timeout=self.config.REQUEST_TIMEOUT)
+            response = self.session.get(url, timeout=self.config.REQUEST_TIMEOUT)
             
             # Проверяем статус ответа
             response.raise_for_status()
             
-            # Парсим ответ
-            data = response.json()
-            
+            # Парсим ответ (jsonio использует orjson, если тот установлен)
+            data = jsonio.loads(response.content)
+
             # Проверяем успешность ответа
             if data.get("result") != "success":
                 error_msg = f"API returned error: {data.get('error-type', 'Unknown error')}"
@@ -138,21 +160,26 @@ class ExchangeRateApiClient(BaseApiClient):
                 raise ApiRequestError(error_msg)
             
             # Извлекаем курсы
-            rates = {}
-            timestamp = datetime.strptime(data["time_last_update_utc"], "%a, %d %b %Y %H:%M:%S %z").strftime(self.config.DATETIME_FORMAT)
-            
-            # Преобразуем данные в единый формат
-            for code in self.config.FIAT_CURRENCIES:
-                if code in data["conversion_rates"]:
-                    rate = data["conversion_rates"][code]
-                    # Для фиатных валют мы получаем сколько базовой валюты в 1 единице данной валюты
-                    # Поэтому нужно инвертировать курс для нашего формата
-                    pair = f"{code}_{self.config.BASE_CURRENCY}"
-                    rates[pair] = {
-                        "rate": 1 / rate,
-                        "updated_at": timestamp,
-                        "source": "ExchangeRate-API"
-                    }
+            # parsedate_to_datetime разбирает RFC 2822 дату быстрее,
+            # чем strptime с форматом "%a, %d %b %Y %H:%M:%S %z"
+            timestamp = parsedate_to_datetime(
+                data["time_last_update_utc"]
+            ).strftime(self.config.DATETIME_FORMAT)
+            
+            # Преобразуем данные в единый формат одним проходом.
+            # API отдает сколько данной валюты в 1 единице базовой,
+            # поэтому курс инвертируется для нашего формата
+            conversion_rates = data["conversion_rates"]
+            base = self.config.BASE_CURRENCY
+            rates = {
+                f"{code}_{base}": {
+                    "rate": 1 / conversion_rates[code],
+                    "updated_at": timestamp,
+                    "source": "ExchangeRate-API"
+                }
+                for code in self.config.FIAT_CURRENCIES
+                if code in conversion_rates
+            }
             
             logger.info(f"Successfully fetched {len(rates)} fiat currency rates from ExchangeRate-API")
             return rates
@@ -1,12 +1,16 @@
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Dict, Tuple
 
 
-@dataclass
+@dataclass(frozen=True)
 class ParserConfig:
-    """Конфигурация для сервиса парсинга курсов."""
-    
+    """Конфигурация для сервиса парсинга курсов.
+
+    Конфигурация неизменяемая; производные от нее строки вычисляются
+    один раз в __post_init__, а не на каждый запрос клиента.
+    """
+
     # API ключ загружается из переменных окружения
     EXCHANGERATE_API_KEY: str = os.getenv("EXCHANGERATE_API_KEY", "")
     
@@ -22,7 +26,7 @@ class ParserConfig:
     CRYPTO_CURRENCIES: Tuple[str, ...] = ("BTC", "ETH", "SOL", "XRP", "ADA", "DOGE", "DOT")
     
     # Маппинг ID для CoinGecko
-    CRYPTO_ID_MAP: Dict[str, str] = {
+    CRYPTO_ID_MAP: Dict[str, str] = field(default_factory=lambda: {
         "BTC": "bitcoin",
         "ETH": "ethereum",
         "SOL": "solana",
@@ -30,10 +34,23 @@ class ParserConfig:
         "ADA": "cardano",
         "DOGE": "dogecoin",
         "DOT": "polkadot"
-    }
+    })
     
     # Сетевые параметры
     REQUEST_TIMEOUT: int = 10  # секунд
-    
+
     # Форматы даты/времени
-    DATETIME_FORMAT: str = "%Y-%m-%dT%H:%M:%SZ"
\ No newline at end of file
+    DATETIME_FORMAT: str = "%Y-%m-%dT%H:%M:%SZ"
+
+    def __post_init__(self):
+        # frozen-датакласс запрещает обычное присваивание,
+        # поэтому производные поля задаются через object.__setattr__
+        object.__setattr__(self, "base_currency_lower", self.BASE_CURRENCY.lower())
+        object.__setattr__(self, "crypto_ids_csv", ",".join(
+            self.CRYPTO_ID_MAP[code] for code in self.CRYPTO_CURRENCIES
+            if code in self.CRYPTO_ID_MAP
+        ))
+        object.__setattr__(self, "exchangerate_latest_url", (
+            f"{self.EXCHANGERATE_API_URL}/{self.EXCHANGERATE_API_KEY}"
+            f"/latest/{self.BASE_CURRENCY}"
+        ))
\ No newline at end of file
@@ -1,50 +1,63 @@
-import json
 import logging
-import tempfile
+import mmap
+import os
 from datetime import datetime
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List
+
+from ..infra import jsonio
 
 logger = logging.getLogger(__name__)
 
+# Порог ротации файла истории (как LOG_MAX_BYTES у логов)
+DEFAULT_MAX_HISTORY_BYTES = 10 * 1024 * 1024
+
+# С этого размера файл читается через mmap (см. MMAP_MIN_SIZE в infra.database)
+_MMAP_MIN_SIZE = 64 * 1024
+
 class RatesStorage:
-    """Класс для работы с хранилищем курсов валют."""
-    
-    def __init__(self, rates_file: Path, history_file: Path):
+    """Класс для работы с хранилищем курсов валют.
+
+    История хранится в формате NDJSON (одна JSON-запись на строку):
+    добавление записи - это один append без чтения и перезаписи файла.
+    """
+
+    def __init__(self, rates_file: Path, history_file: Path,
+                 max_history_bytes: int = DEFAULT_MAX_HISTORY_BYTES):
         """
         Инициализация хранилища.
-        
+
         Args:
             rates_file: Путь к файлу с актуальными курсами
-            history_file: Путь к файлу с историей курсов
+            history_file: Путь к файлу с историей курсов (NDJSON)
+            max_history_bytes: Размер файла истории, при котором он ротируется
         """
         self.rates_file = rates_file
         self.history_file = history_file
+        self.max_history_bytes = max_history_bytes
     
     def _read_json(self, file_path: Path) -> Any:
         """Прочитать данные из JSON файла."""
+        # Без предварительного exists(): отсутствие файла ловится
+        # ниже как FileNotFoundError - одним системным вызовом меньше
         try:
-            if not file_path.exists():
-                return {}
-            
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except (json.JSONDecodeError, FileNotFoundError, IOError) as e:
+            with open(file_path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size >= _MMAP_MIN_SIZE:
+                    # Крупный файл: парсим из отображения без копии
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        return jsonio.loads(mm)
+                return jsonio.loads(f.read())
+        except FileNotFoundError:
+            return {}
+        except (ValueError, IOError) as e:
             logger.error(f"Error reading JSON file {file_path}: {str(e)}")
             return {}
-    
+
     def _write_json(self, file_path: Path, data: Any):
         """Записать данные в JSON файл атомарно."""
         try:
-            # Создаем временную директорию для атомарной записи
-            with tempfile.NamedTemporaryFile(mode='w', dir=file_path.parent, delete=False, suffix='.tmp', encoding='utf-8') as tmp_file:
-                json.dump(data, tmp_file, indent=2, ensure_ascii=False)
-                tmp_file_path = Path(tmp_file.name)
-            
-            # Атомарно заменяем файл
-            tmp_file_path.replace(file_path)
+            jsonio.atomic_write_json(file_path, data)
             logger.info(f"Successfully wrote data to {file_path}")
-            
         except (IOError, OSError) as e:
             logger.error(f"Error writing JSON file {file_path}: {str(e)}")
             raise
@@ -67,25 +80,71 @@ class RatesStorage:
         self._write_json(self.rates_file, rates_data)
         logger.info(f"Saved current rates to {self.rates_file}")
     
+    def iter_history(self) -> Iterator[Dict]:
+        """Итерироваться по записям истории, не загружая файл целиком.
+
+        Читает NDJSON построчно: память не зависит от размера истории,
+        а потребители с фильтром могут прервать обход досрочно.
+        """
+        try:
+            with open(self.history_file, 'rb') as f:
+                for line in f:
+                    if line.strip():
+                        yield jsonio.loads(line)
+        except FileNotFoundError:
+            return
+        except (ValueError, IOError) as e:
+            logger.error(f"Error reading history file {self.history_file}: {str(e)}")
+            return
+
     def load_history(self) -> List[Dict]:
-        """Загрузить историю курсов из файла."""
-        history = self._read_json(self.history_file)
-        return history if isinstance(history, list) else []
-    
+        """Загрузить всю историю курсов списком (см. iter_history)."""
+        return list(self.iter_history())
+
+    def _rotate_history_if_needed(self):
+        """Переименовать файл истории в .1, если он превысил порог.
+
+        Тот же подход, что у RotatingFileHandler в logging_config:
+        старые записи уходят в резервный файл, append продолжается
+        в новый - без чтения и перезаписи накопленной истории.
+        """
+        try:
+            if os.stat(self.history_file).st_size < self.max_history_bytes:
+                return
+        except OSError:
+            return
+
+        backup_file = self.history_file.with_suffix(self.history_file.suffix + '.1')
+        self.history_file.replace(backup_file)
+        logger.info(f"Rotated history file to {backup_file}")
+
     def append_to_history(self, record: Dict):
         """
         Добавить запись в историю курсов.
-        
+
+        Запись дописывается одной строкой в конец файла: стоимость
+        операции не зависит от накопленного размера истории.
+
         Args:
             record: Запись для добавления
         """
-        history = self.load_history()
-        history.append(record)
-        
-        # Ограничиваем размер истории для производительности
-        MAX_HISTORY_SIZE = 10000
-        if len(history) > MAX_HISTORY_SIZE:
-            history = history[-MAX_HISTORY_SIZE:]
-        
-        self._write_json(self.history_file, history)
-        logger.info(f"Appended record to history file {self.history_file}")
\ No newline at end of file
+        self.append_many([record])
+
+    def append_many(self, records: List[Dict]):
+        """
+        Добавить несколько записей в историю одной записью в файл.
+
+        Все записи сериализуются заранее и дописываются одним write -
+        обновление с P парами стоит одно открытие файла, а не P.
+
+        Args:
+            records: Список записей для добавления
+        """
+        if not records:
+            return
+
+        self._rotate_history_if_needed()
+        payload = b"".join(jsonio.dumps_line(record) + b"\n" for record in records)
+        with open(self.history_file, 'ab') as f:
+            f.write(payload)
+        logger.info(f"Appended {len(records)} record(s) to history file {self.history_file}")
\ No newline at end of file
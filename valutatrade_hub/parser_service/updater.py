@@ -1,4 +1,5 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
@@ -12,16 +13,20 @@ logger = logging.getLogger(__name__)
 class RatesUpdater:
     """Класс для обновления курсов валют."""
     
-    def __init__(self, config: ParserConfig, storage: RatesStorage):
+    def __init__(self, config: ParserConfig, storage: RatesStorage,
+                 ttl_seconds: int = 300):
         """
         Инициализация обновителя курсов.
-        
+
         Args:
             config: Конфигурация
             storage: Хранилище для сохранения данных
+            ttl_seconds: Срок свежести курсов; пока он не истек,
+                обновление без force пропускается
         """
         self.config = config
         self.storage = storage
+        self.ttl_seconds = ttl_seconds
         self.clients: List[BaseApiClient] = []
     
     def add_client(self, client: BaseApiClient):
@@ -33,23 +38,47 @@ class RatesUpdater:
         """
         self.clients.append(client)
     
-    def run_update(self, source: Optional[str] = None) -> Dict[str, Any]:
+    def _rates_fresh(self, current_rates: Dict[str, Any]) -> bool:
+        """Проверить, не истек ли срок свежести сохраненных курсов."""
+        last_refresh = current_rates.get("last_refresh")
+        if not last_refresh:
+            return False
+        try:
+            refreshed_at = datetime.fromisoformat(last_refresh)
+        except ValueError:
+            return False
+        return (datetime.utcnow() - refreshed_at).total_seconds() < self.ttl_seconds
+
+    def run_update(self, source: Optional[str] = None,
+                   force: bool = False) -> Dict[str, Any]:
         """
         Запустить обновление курсов.
-        
+
         Args:
             source: Источник для обновления (опционально)
-            
+            force: Обновить даже если курсы еще свежие
+
         Returns:
             Dict[str, Any]: Результат обновления
         """
         logger.info("Starting rates update process")
-        
+
         # Загружаем текущие курсы
         current_rates = self.storage.load_current_rates()
         if "pairs" not in current_rates:
             current_rates["pairs"] = {}
-        
+
+        # Курсы еще свежие - не ходим в сеть и не трогаем историю
+        if not force and source is None and self._rates_fresh(current_rates):
+            logger.info("Rates are still fresh; skipping update")
+            return {
+                "success": True,
+                "updated_pairs": [],
+                "errors": [],
+                "skipped": True,
+                "timestamp": current_rates.get("last_refresh")
+            }
+
         update_results = {
             "success": True,
             "updated_pairs": [],
@@ -66,21 +95,32 @@ class RatesUpdater:
             elif source_lower == "exchangerate":
                 clients_to_use = [client for client in self.clients if isinstance(client, ExchangeRateApiClient)]
         
-        # Опрашиваем каждого клиента
-        for client in clients_to_use:
+        # Опрашиваем клиентов параллельно: запросы - чистое ожидание
+        # сети, поэтому время обновления равно самому медленному ответу,
+        # а не сумме. Записи истории копим и пишем одним батчем в конце
+        history_records = []
+        futures = {}
+        if clients_to_use:
+            pool = ThreadPoolExecutor(max_workers=len(clients_to_use))
+            futures = {
+                pool.submit(client.fetch_rates): client
+                for client in clients_to_use
+            }
+
+        for future in as_completed(futures):
+            client = futures[future]
             client_name = type(client).__name__
-            logger.info(f"Fetching rates from {client_name}")
-            
+
             try:
-                new_rates = client.fetch_rates()
-                
+                new_rates = future.result()
+
                 # Обновляем курсы в текущих данных
                 for pair, rate_data in new_rates.items():
                     current_rates["pairs"][pair] = rate_data
                     update_results["updated_pairs"].append(pair)
-                    
+
                     # Добавляем запись в историю
-                    history_record = {
+                    history_records.append({
                         "id": f"{pair}_{rate_data['updated_at']}",
                         "from_currency": pair.split('_')[0],
                         "to_currency": pair.split('_')[1],
@@ -90,23 +130,28 @@ class RatesUpdater:
                         "meta": {
                             "client": client_name
                         }
-                    }
-                    self.storage.append_to_history(history_record)
-                
+                    })
+
                 logger.info(f"Successfully updated {len(new_rates)} rates from {client_name}")
-                
+
             except ApiRequestError as e:
                 error_msg = f"Failed to fetch rates from {client_name}: {str(e)}"
                 logger.error(error_msg)
                 update_results["errors"].append(error_msg)
                 update_results["success"] = False
-        
-        # Обновляем время последнего обновления
-        current_rates["last_refresh"] = datetime.utcnow().isoformat()
-        
-        # Сохраняем обновленные курсы
-        self.storage.save_current_rates(current_rates)
-        
+
+        if futures:
+            # Все future уже завершены - закрываем пул без ожидания
+            pool.shutdown(wait=False)
+
+        # last_refresh двигаем только если хоть что-то получили:
+        # иначе TTL-гейт посчитает неудавшееся обновление свежим
+        # и будет молча пропускать повторные попытки
+        if update_results["updated_pairs"]:
+            self.storage.append_many(history_records)
+            current_rates["last_refresh"] = datetime.utcnow().isoformat()
+            self.storage.save_current_rates(current_rates)
+
         logger.info(f"Rates update completed. Updated {len(update_results['updated_pairs'])} pairs, encountered {len(update_results['errors'])} errors")
         
         return update_results
\ No newline at end of file